@@ -1,22 +1,280 @@
 import json
 import os
 import random
+import sys
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, deque
+from dataclasses import asdict, dataclass, is_dataclass
 from datetime import datetime, timedelta
+from functools import cached_property
+
+try:
+    import orjson
+except ImportError:  # optional speedup, fall back to stdlib json
+    orjson = None
 
 DATA_FILE = "leetcode_data.json"
+SESSIONS_FILE = "leetcode_sessions.ndjson"
 DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+RECENT_SESSIONS = 5
+
+_DIFF_MAP = {
+    "e": "easy",
+    "easy": "easy",
+    "m": "medium",
+    "med": "medium",
+    "medium": "medium",
+    "h": "hard",
+    "hard": "hard",
+}
+
+# SM-2 recall quality (0-5) for each session result
+_QUALITY = {"solved": 5, "partial": 3, "unsolved": 1}
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+MAX_EASE = 5.0
+MAX_INTERVAL_DAYS = 36500  # keeps next_review within datetime range
+
+
+@dataclass(slots=True)
+class Problem:
+    title: str
+    slug: str
+    url: str
+    difficulty: str
+    topics: tuple
+    attempts: int = 0
+    last_status: str | None = None
+    last_practiced: str | None = None
+    next_review: str | None = None
+    next_review_ts: int = 0
+    ease: float = DEFAULT_EASE
+    interval: float = 0.0
+    reps: int = 0
+
+    def __post_init__(self):
+        self.topics = tuple(self.topics)
+
+
+@dataclass(slots=True)
+class Session:
+    problem_id: str
+    start: str
+    end: str
+    minutes: float
+    status: str
+    notes: str
+
+
+def _json_loads(raw):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _json_dumps(obj, pretty=False):
+    """Serialize obj to UTF-8 bytes, compact unless pretty is set."""
+    if orjson is not None:
+        # orjson serializes dataclasses natively
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        text = json.dumps(obj, indent=2, ensure_ascii=False, default=_to_json)
+    else:
+        text = json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=_to_json)
+    return text.encode("utf-8")
+
+
+def _to_json(obj):
+    if is_dataclass(obj):
+        return asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class PracticeData:
+    """
+    In-memory state: problems plus their indexes and counters.
+    Session data is read from the log only when stats need it.
+    """
+
+    def __init__(self, problems):
+        self.problems = problems
+        self.indexes = None  # set by build_indexes
+        self.counters = None  # set by build_counters
+
+    @cached_property
+    def recent_sessions(self):
+        # Only the tail of the session log is ever shown, so don't parse the rest
+        return deque(read_recent_sessions(), maxlen=RECENT_SESSIONS)
+
+    @cached_property
+    def session_count(self):
+        return count_sessions()
+
+    def add_session(self, record):
+        append_session(record)
+        # Views that haven't been loaded yet will pick the record up from disk
+        if "recent_sessions" in self.__dict__:
+            self.recent_sessions.append(record)
+        if "session_count" in self.__dict__:
+            self.session_count += 1
 
 
 def load_data():
-    if not os.path.exists(DATA_FILE):
-        return {"problems": {}, "sessions": []}
-    with open(DATA_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    data = PracticeData({})
+    changed = False
+    if os.path.exists(DATA_FILE):
+        with open(DATA_FILE, "rb") as f:
+            stored = _json_loads(f.read())
+        changed = migrate_problems(stored["problems"])
+        data.problems = {pid: Problem(**p) for pid, p in stored["problems"].items()}
+        # Older files kept sessions inline; move them to the session log.
+        # The log is written whole and swapped in, and skipped if it already
+        # has content, so a crash before save_problems can't duplicate them.
+        if stored.get("sessions"):
+            if not os.path.exists(SESSIONS_FILE) or os.path.getsize(SESSIONS_FILE) == 0:
+                tmp_file = SESSIONS_FILE + ".tmp"
+                with open(tmp_file, "wb") as f:
+                    f.writelines(_dump_session(s) for s in stored["sessions"])
+                os.replace(tmp_file, SESSIONS_FILE)
+            changed = True
+    if changed:
+        save_problems(data)
+    return data
+
+
+def read_recent_sessions(n=RECENT_SESSIONS):
+    """Return the last n session records by reading backwards from the end of the log."""
+    if not os.path.exists(SESSIONS_FILE):
+        return []
+    with open(SESSIONS_FILE, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        tail = b""
+        # n + 1 newlines guarantee the last n lines are complete
+        while pos > 0 and tail.count(b"\n") <= n:
+            step = min(4096, pos)
+            pos -= step
+            f.seek(pos)
+            tail = f.read(step) + tail
+    lines = [line for line in tail.splitlines() if line.strip()]
+    return [Session(**_json_loads(line)) for line in lines[max(len(lines) - n, 0):]]
+
+
+def count_sessions():
+    """Count logged sessions without parsing them."""
+    if not os.path.exists(SESSIONS_FILE):
+        return 0
+    count = 0
+    with open(SESSIONS_FILE, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            count += block.count(b"\n")
+    return count
+
+
+def migrate_problems(problems):
+    """
+    Bring raw problem dicts saved by older versions up to date:
+    - backfill next_review_ts
+    - lowercase topics
+    - add SM-2 scheduling state (ease, interval, reps)
+    Returns True if anything changed.
+    """
+    migrated = False
+    for p in problems.values():
+        if "next_review_ts" not in p:
+            nr = p.get("next_review")
+            p["next_review_ts"] = int(datetime.fromisoformat(nr).timestamp()) if nr else 0
+            migrated = True
+        if "ease" not in p:
+            p["ease"] = DEFAULT_EASE
+            p["interval"] = 0.0
+            p["reps"] = 0
+            migrated = True
+        topics = normalize_topics(p["topics"])
+        if topics != p["topics"]:
+            p["topics"] = topics
+            migrated = True
+    return migrated
+
+
+def save_problems(data):
+    payload = _json_dumps(
+        {"problems": data.problems}, pretty=bool(os.environ.get("LEETCODE_PRETTY"))
+    )
+    # Write to a temp file and swap it in so a crash can't truncate the store
+    tmp_file = DATA_FILE + ".tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(payload)
+    os.replace(tmp_file, DATA_FILE)
+
+
+def _dump_session(record):
+    return _json_dumps(record) + b"\n"
+
+
+def append_session(record):
+    """Append one session to the session log instead of rewriting everything."""
+    with open(SESSIONS_FILE, "ab", buffering=1 << 16) as f:
+        f.write(_dump_session(record))
+
+
+def build_indexes(data):
+    """
+    Build lookup indexes over data.problems:
+    - by_difficulty: difficulty -> set of problem ids
+    - by_topic: topic -> set of problem ids
+    - due: sorted list of (next_review_ts, problem_id)
+    """
+    indexes = {"by_difficulty": {}, "by_topic": {}, "due": []}
+    # Visiting in due order makes every insort an append
+    for pid, p in sorted(data.problems.items(), key=lambda item: (item[1].next_review_ts, item[0])):
+        index_problem(indexes, pid, p)
+    data.indexes = indexes
+
+
+def build_counters(data):
+    """Compute the stats counters once; they are kept up to date incrementally."""
+    by_difficulty = Counter()
+    solved = 0
+    for p in data.problems.values():
+        by_difficulty[p.difficulty] += 1
+        solved += p.last_status == "solved"
+    data.counters = {"by_difficulty": by_difficulty, "solved": solved}
+
+
+def index_problem(indexes, pid, p):
+    indexes["by_difficulty"].setdefault(p.difficulty, set()).add(pid)
+    for t in p.topics:
+        indexes["by_topic"].setdefault(t, set()).add(pid)
+    insort(indexes["due"], (p.next_review_ts, pid))
+
+
+def unindex_problem(indexes, pid, p):
+    indexes["by_difficulty"].get(p.difficulty, set()).discard(pid)
+    for t in p.topics:
+        indexes["by_topic"].get(t, set()).discard(pid)
+    _remove_due(indexes["due"], p.next_review_ts, pid)
 
 
-def save_data(data):
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
+def _remove_due(due, ts, pid):
+    i = bisect_left(due, (ts, pid))
+    if i < len(due) and due[i] == (ts, pid):
+        del due[i]
+
+
+def reschedule_problem(data, pid, old_ts):
+    """Move pid in the due list from old_ts to its current next_review_ts."""
+    due = data.indexes["due"]
+    _remove_due(due, old_ts, pid)
+    insort(due, (data.problems[pid].next_review_ts, pid))
+
+
+def iter_due(data, now_ts):
+    """Yield ids of problems with next_review_ts <= now_ts, soonest first."""
+    due = data.indexes["due"]
+    end = bisect_right(due, now_ts, key=lambda entry: entry[0])
+    for i in range(end):
+        yield due[i][1]
 
 
 def input_non_empty(prompt):
@@ -28,14 +286,12 @@ def input_non_empty(prompt):
 
 
 def normalize_difficulty(diff):
-    diff = diff.lower().strip()
-    if diff in ["e", "easy"]:
-        return "easy"
-    if diff in ["m", "medium", "med"]:
-        return "medium"
-    if diff in ["h", "hard"]:
-        return "hard"
-    return None
+    return _DIFF_MAP.get(diff.lower().strip())
+
+
+def normalize_topics(topics):
+    """Strip and lowercase topics, dropping blanks and duplicates (order kept)."""
+    return list(dict.fromkeys(t.strip().lower() for t in topics if t.strip()))
 
 
 def add_problem(data):
@@ -56,70 +312,82 @@ def add_problem(data):
     topics_input = input(
         "Topics (comma-separated, e.g. array, hash-table, greedy): "
     ).strip()
-    topics = [t.strip() for t in topics_input.split(",") if t.strip()]
+    topics = normalize_topics(topics_input.split(","))
 
     problem_id = slug  # we’ll use slug as unique key
 
-    if problem_id in data["problems"]:
+    indexes = data.indexes
+    counters = data.counters
+    if problem_id in data.problems:
         print("Problem already exists. Updating its info.")
+        old = data.problems[problem_id]
+        unindex_problem(indexes, problem_id, old)
+        counters["by_difficulty"][old.difficulty] -= 1
+        counters["solved"] -= old.last_status == "solved"
     else:
         print("Adding new problem.")
 
-    data["problems"][problem_id] = {
-        "title": title,
-        "slug": slug,
-        "url": url,
-        "difficulty": difficulty,
-        "topics": topics,
-        "attempts": 0,
-        "last_status": None,
-        "last_practiced": None,
-        "next_review": None,
-    }
-
-    save_data(data)
+    data.problems[problem_id] = Problem(
+        title=title,
+        slug=slug,
+        url=url,
+        difficulty=difficulty,
+        topics=topics,
+    )
+    index_problem(indexes, problem_id, data.problems[problem_id])
+    counters["by_difficulty"][difficulty] += 1
+
+    save_problems(data)
     print(f"Saved: {title} ({difficulty}, topics: {', '.join(topics) if topics else 'none'})")
 
 
 def list_problems(data):
-    problems = data["problems"]
+    problems = data.problems
     if not problems:
         print("\nNo problems saved yet.")
         return
 
-    print("\n=== Problem List ===")
-    for pid, p in problems.items():
-        print(f"- [{pid}] {p['title']} | {p['difficulty']} | topics: {', '.join(p['topics']) or 'none'}")
-        print(f"  URL: {p['url']}")
-        print(f"  Attempts: {p['attempts']}, Last status: {p['last_status']}, Next review: {p['next_review']}")
-    print()
-
+    # Build the whole listing and write it at once instead of print() per line
+    lines = ["\n=== Problem List ==="]
+    lines.extend(
+        f"- [{pid}] {p.title} | {p.difficulty} | topics: {', '.join(p.topics) or 'none'}\n"
+        f"  URL: {p.url}\n"
+        f"  Attempts: {p.attempts}, Last status: {p.last_status}, Next review: {p.next_review}"
+        for pid, p in problems.items()
+    )
+    lines.append("")
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
+def iter_candidates(data, diff_filter=None, topic_filter=None, only_due=False):
+    """Yield problem_ids that match filters, without building a list."""
+    problems = data.problems
+    indexes = data.indexes
+    # Never-practiced problems have next_review_ts == 0, so they're always due
+    now_ts = int(time.time())
+
+    pools = []
+    if diff_filter:
+        pools.append(indexes["by_difficulty"].get(diff_filter, set()))
+    if topic_filter:
+        pools.append(indexes["by_topic"].get(topic_filter, set()))
+    if not pools:
+        yield from iter_due(data, now_ts) if only_due else problems
+        return
 
-def filter_problems(data, diff_filter=None, topic_filter=None, only_due=False):
-    """Return a list of problem_ids that match filters."""
-    now = datetime.now()
-    result = []
-    for pid, p in data["problems"].items():
-        if diff_filter and p["difficulty"] != diff_filter:
+    # Walk the smallest index and check membership in the others
+    pools.sort(key=len)
+    smallest, rest = pools[0], pools[1:]
+    for pid in smallest:
+        if any(pid not in pool for pool in rest):
+            continue
+        if only_due and problems[pid].next_review_ts > now_ts:
             continue
-        if topic_filter:
-            if topic_filter not in [t.lower() for t in p["topics"]]:
-                continue
-        if only_due:
-            nr = p["next_review"]
-            if nr is None:
-                # If never practiced, it's due
-                pass
-            else:
-                nr_dt = datetime.strptime(nr, DATE_FORMAT)
-                if nr_dt > now:
-                    continue
-        result.append(pid)
-    return result
+        yield pid
 
 
 def choose_problem(data):
-    if not data["problems"]:
+    if not data.problems:
         print("\nYou have no problems saved. Add some first.")
         return None
 
@@ -139,45 +407,56 @@ def choose_problem(data):
             topic_filter = topic_input
         only_due = input("Only show due for review? (y/n): ").strip().lower() == "y"
 
-    candidates = filter_problems(data, diff_filter, topic_filter, only_due)
+    # Reservoir sampling: pick uniformly in one pass over the candidates
+    pid = None
+    for i, candidate in enumerate(iter_candidates(data, diff_filter, topic_filter, only_due)):
+        if random.random() < 1 / (i + 1):
+            pid = candidate
 
-    if not candidates:
+    if pid is None:
         print("No problems match these filters.")
         return None
 
-    pid = random.choice(candidates)
-    p = data["problems"][pid]
+    p = data.problems[pid]
     print("\n=== Practice This Problem ===")
     print(f"ID: {pid}")
-    print(f"Title: {p['title']}")
-    print(f"Difficulty: {p['difficulty']}")
-    print(f"Topics: {', '.join(p['topics']) or 'none'}")
-    print(f"URL: {p['url']}")
+    print(f"Title: {p.title}")
+    print(f"Difficulty: {p.difficulty}")
+    print(f"Topics: {', '.join(p.topics) or 'none'}")
+    print(f"URL: {p.url}")
     print("Open the URL, start solving, then come back to log the result.")
     return pid
 
 
-def schedule_next_review(status, difficulty):
+def schedule_next_review(problem, status):
     """
-    Very simple spaced repetition:
-    - If solved:
-        easy: 3 days
-        medium: 2 days
-        hard: 1 day
-    - If partial/unsolved: tomorrow
+    SM-2 spaced repetition, updating problem's ease / interval / reps:
+    - If solved: 1 day, then 6 days, then previous interval * ease
+    - If partial/unsolved: start over from 1 day
+    - Intervals are capped at MAX_INTERVAL_DAYS
+    - Ease moves up or down with the result quality (within MIN_EASE..MAX_EASE)
+
+    Returns (human-readable string, Unix timestamp).
     """
-    now = datetime.now()
     status = (status or "").lower()
+    q = _QUALITY.get(status, 0)
+    ease = problem.ease
     if status == "solved":
-        if difficulty == "easy":
-            delta = timedelta(days=3)
-        elif difficulty == "medium":
-            delta = timedelta(days=2)
-        else:  # hard
-            delta = timedelta(days=1)
+        problem.reps += 1
+        if problem.reps == 1:
+            problem.interval = 1.0
+        elif problem.reps == 2:
+            problem.interval = 6.0
+        else:
+            problem.interval = min(problem.interval * ease, MAX_INTERVAL_DAYS)
     else:
-        delta = timedelta(days=1)
-    return (now + delta).strftime(DATE_FORMAT)
+        problem.reps = 0
+        problem.interval = 1.0
+    ease += 0.1 - (5 - q) * (0.08 + (5 - q) * 0.02)
+    problem.ease = min(max(ease, MIN_EASE), MAX_EASE)
+
+    next_review = datetime.now() + timedelta(days=problem.interval)
+    return next_review.strftime(DATE_FORMAT), int(next_review.timestamp())
 
 
 def start_practice_session(data):
@@ -185,12 +464,14 @@ def start_practice_session(data):
     if pid is None:
         return
 
-    start_time = datetime.now()
-    print(f"\nSession started at {start_time.strftime(DATE_FORMAT)}")
+    # Wall-clock strings are only for the record; duration uses the monotonic clock
+    start_str = datetime.now().strftime(DATE_FORMAT)
+    start_mono = time.monotonic()
+    print(f"\nSession started at {start_str}")
     input("Press Enter when you finish solving (or stop) to log the result...")
 
-    end_time = datetime.now()
-    minutes = (end_time - start_time).total_seconds() / 60
+    minutes = (time.monotonic() - start_mono) / 60
+    end_str = datetime.now().strftime(DATE_FORMAT)
     print(f"\nSession duration: {minutes:.1f} minutes")
 
     while True:
@@ -201,66 +482,60 @@ def start_practice_session(data):
 
     notes = input("Any notes (approach, mistakes, patterns)? (optional): ").strip()
 
-    problem = data["problems"][pid]
-    problem["attempts"] += 1
-    problem["last_status"] = status
-    problem["last_practiced"] = end_time.strftime(DATE_FORMAT)
-    problem["next_review"] = schedule_next_review(status, problem["difficulty"])
-
-    session_record = {
-        "problem_id": pid,
-        "start": start_time.strftime(DATE_FORMAT),
-        "end": end_time.strftime(DATE_FORMAT),
-        "minutes": round(minutes, 1),
-        "status": status,
-        "notes": notes,
-    }
-    data["sessions"].append(session_record)
-
-    save_data(data)
+    problem = data.problems[pid]
+    counters = data.counters
+    counters["solved"] += (status == "solved") - (problem.last_status == "solved")
+    old_ts = problem.next_review_ts
+    problem.attempts += 1
+    problem.last_status = status
+    problem.last_practiced = end_str
+    problem.next_review, problem.next_review_ts = schedule_next_review(problem, status)
+    reschedule_problem(data, pid, old_ts)
+
+    session_record = Session(
+        problem_id=pid,
+        start=start_str,
+        end=end_str,
+        minutes=round(minutes, 1),
+        status=status,
+        notes=notes,
+    )
+    data.add_session(session_record)
+    save_problems(data)
 
     print("\n=== Session Logged ===")
-    print(f"Problem: {problem['title']} ({pid})")
+    print(f"Problem: {problem.title} ({pid})")
     print(f"Status: {status}")
     print(f"Time: {minutes:.1f} minutes")
-    print(f"Next review scheduled: {problem['next_review']}")
+    print(f"Next review scheduled: {problem.next_review}")
 
 
 def stats_overview(data):
-    problems = data["problems"]
-    sessions = data["sessions"]
-
-    print("\n=== Stats Overview ===")
-    print(f"Total problems saved: {len(problems)}")
-    print(f"Total sessions: {len(sessions)}")
-
-    by_difficulty = {"easy": 0, "medium": 0, "hard": 0}
-    solved_count = 0
-
-    for p in problems.values():
-        d = p["difficulty"]
-        if d in by_difficulty:
-            by_difficulty[d] += 1
-        if p["last_status"] == "solved":
-            solved_count += 1
-
-    print("Problems by difficulty:")
-    for d in ["easy", "medium", "hard"]:
-        print(f"  {d}: {by_difficulty[d]}")
-
-    print(f"Solved at least once: {solved_count}")
-
-    # Last 5 sessions
-    print("\nLast 5 sessions:")
-    for s in sessions[-5:]:
-        print(
-            f"- {s['start']} | {s['problem_id']} | {s['status']} | {s['minutes']} min"
-        )
-    print()
+    counters = data.counters
+    by_difficulty = counters["by_difficulty"]
+
+    lines = [
+        "\n=== Stats Overview ===",
+        f"Total problems saved: {len(data.problems)}",
+        f"Total sessions: {data.session_count}",
+        "Problems by difficulty:",
+    ]
+    lines.extend(f"  {d}: {by_difficulty[d]}" for d in ["easy", "medium", "hard"])
+    lines.append(f"Solved at least once: {counters['solved']}")
+
+    lines.append(f"\nLast {RECENT_SESSIONS} sessions:")
+    lines.extend(
+        f"- {s.start} | {s.problem_id} | {s.status} | {s.minutes} min"
+        for s in data.recent_sessions
+    )
+    lines.append("")
+    sys.stdout.write("\n".join(lines) + "\n")
 
 
 def main_menu():
     data = load_data()
+    build_indexes(data)
+    build_counters(data)
 
     while True:
         print("\n========== LeetCode Practice Assistant ==========")